@@ -5,26 +5,43 @@ import statistics
 import sys
 from scipy.stats import gmean  # 需要 scipy
 
+def read_overflow(path):
+    # 讀取 debugfs tsp_kbench/overflow 或 /sys/kernel/tsp/overflow 的快照（"queued N" / "spin N"）
+    # 核心沒有 ron_overflow_stats（"unavailable"）或缺欄位時回傳 None
+    counters = {}
+    with open(path) as f:
+        for line in f:
+            fields = line.split()
+            if fields == ["unavailable"]:
+                return None
+            if len(fields) == 2:
+                counters[fields[0]] = int(fields[1])
+    if "queued" not in counters or "spin" not in counters:
+        return None
+    return counters
+
 def main():
     if len(sys.argv) < 2:
-        print(f"Usage: {sys.argv[0]} <csv_file>")
+        print(f"Usage: {sys.argv[0]} <csv_file> [overflow_file]")
         sys.exit(1)
 
     csv_file = sys.argv[1]
     avg_waits = []
+    max_waits = []
 
     # 讀取 CSV
     with open(csv_file, newline='') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
-                avg_waits.append(float(row["avg_wait_ns"]))
-            except KeyError:
-                print("CSV 欄位缺少 avg_wait_ns")
-                sys.exit(1)
-            except ValueError:
-                print(f"無法轉換數值: {row['avg_wait_ns']}")
-                sys.exit(1)
+            for field, values in (("avg_wait_ns", avg_waits), ("max_wait_ns", max_waits)):
+                try:
+                    values.append(float(row[field]))
+                except KeyError:
+                    print(f"CSV 欄位缺少 {field}")
+                    sys.exit(1)
+                except ValueError:
+                    print(f"無法轉換數值: {row[field]}")
+                    sys.exit(1)
 
     if not avg_waits:
         print("沒有讀取到任何 avg_wait_ns 數值")
@@ -40,6 +57,10 @@ def main():
     std_dev = statistics.stdev(avg_waits)
     max_min_ratio = max(avg_waits) / min(avg_waits)
 
+    # 尾端延遲（各 thread 的 max_wait_ns）
+    worst_max_wait = max(max_waits)
+    median_max_wait = statistics.median(max_waits)
+
     # 輸出結果
     print("===== TSP Spinlock Benchmark Statistics =====")
     print(f"Number of threads: {len(avg_waits)}")
@@ -47,6 +68,15 @@ def main():
     print(f"Geometric mean of avg_wait_ns: {geometric_mean_value:.2f} ns")
     print(f"Standard deviation: {std_dev:.2f} ns")
     print(f"Max/Min ratio: {max_min_ratio:.2f}")
+    print(f"Worst max_wait_ns: {worst_max_wait:.2f} ns")
+    print(f"Median max_wait_ns: {median_max_wait:.2f} ns")
+    if len(sys.argv) > 2:
+        overflow = read_overflow(sys.argv[2])
+        if overflow is None:
+            print("Overflow counters unavailable")
+        else:
+            print(f"Overflow queued (overflow slot, 4 <= context < 8): {overflow['queued']}")
+            print(f"Overflow spin (no free slot, context >= 8): {overflow['spin']}")
     print("=============================================")
 
 if __name__ == "__main__":
@@ -31,9 +31,26 @@ static bool bind_cpus = false;
 module_param(bind_cpus, bool, 0444);
 MODULE_PARM_DESC(bind_cpus, "Bind each thread to a CPU round-robin");
 
+#define MAX_NEST_DEPTH 12
+
+static int nest_depth = 0; /* private locks held around global_lock */
+module_param(nest_depth, int, 0444);
+MODULE_PARM_DESC(nest_depth, "Private locks each worker holds while taking global_lock (4 = every global_lock acquire overflows, deeper also overflows the private locks)");
+
+/* only present on kernels carrying the ron_qspinlock patch series */
+extern void ron_overflow_stats(unsigned long *queued, unsigned long *spin,
+                               int *max_nodes, int *nr_nodes);
+static void (*overflow_stats_fn)(unsigned long *queued, unsigned long *spin,
+                                 int *max_nodes, int *nr_nodes);
+static unsigned long overflow_queued0, overflow_spin0;
+static int ron_max_nodes, ron_nr_nodes; /* slot layout reported by the kernel */
+
 /* Global spinlock to benchmark - this will use kernel's spinlock implementation */
 static spinlock_t global_lock;
 
+/* one lockdep class per nesting level so nested private locks don't warn */
+static struct lock_class_key nest_keys[MAX_NEST_DEPTH];
+
 struct worker_stats {
     int id;
     struct task_struct *task;
@@ -44,12 +61,14 @@ struct worker_stats {
     u64 max_hold_ns;
     int last_cpu;
     spinlock_t stats_lock; /* protect per-worker aggregates */
+    spinlock_t nest_locks[MAX_NEST_DEPTH];
 };
 
 static struct worker_stats *wstats;
 static u64 *shared_counters;
 static struct dentry *dbg_dir;
 static struct dentry *dbg_stats_file;
+static struct dentry *dbg_overflow_file;
 static int created_threads = 0;
 
 static inline u64 now_ns(void)
@@ -75,8 +94,13 @@ static int worker_fn(void *data)
 
     allow_signal(SIGKILL);
     unsigned long i;
+    int k;
     for (i = 0; i < iterations && !kthread_should_stop(); ++i) {
 
+        /* hold nest_depth locks so global_lock is taken at context >= nest_depth */
+        for (k = 0; k < nest_depth; ++k)
+            spin_lock(&st->nest_locks[k]);
+
         u64 t0 = now_ns();
         spin_lock(&global_lock);
         u64 t1 = now_ns();
@@ -92,6 +116,9 @@ static int worker_fn(void *data)
 
         spin_unlock(&global_lock);
 
+        for (k = nest_depth - 1; k >= 0; --k)
+            spin_unlock(&st->nest_locks[k]);
+
         /* update stats */
         spin_lock(&st->stats_lock);
         st->acquires++;
@@ -157,6 +184,61 @@ static const struct file_operations stats_fops = {
     .release = single_release,
 };
 
+/*
+ * ron_spin_lock overflow events since module init, in the same format as
+ * /sys/kernel/tsp/overflow. Events caused by our own private nest_locks
+ * at context >= 4 are subtracted; other kernel locks are not.
+ */
+static int overflow_show(struct seq_file *m, void *v)
+{
+    unsigned long queued, spin, self_queued, self_spin;
+    u64 acquires = 0;
+    int i, k;
+
+    if (!overflow_stats_fn) {
+        seq_puts(m, "unavailable\n");
+        return 0;
+    }
+
+    /* sum acquires before reading the counters so we never subtract more than was counted */
+    for (i = 0; i < threads; ++i) {
+        spin_lock(&wstats[i].stats_lock);
+        acquires += wstats[i].acquires;
+        spin_unlock(&wstats[i].stats_lock);
+    }
+
+    overflow_stats_fn(&queued, &spin, NULL, NULL);
+    queued = queued >= overflow_queued0 ? queued - overflow_queued0 : 0;
+    spin = spin >= overflow_spin0 ? spin - overflow_spin0 : 0;
+
+    self_queued = 0;
+    self_spin = 0;
+    for (k = ron_max_nodes; k < nest_depth; ++k) {
+        if (k < ron_nr_nodes)
+            self_queued += acquires;
+        else
+            self_spin += acquires;
+    }
+
+    seq_printf(m, "queued %lu\nspin %lu\n",
+               queued >= self_queued ? queued - self_queued : 0,
+               spin >= self_spin ? spin - self_spin : 0);
+    return 0;
+}
+
+static int overflow_open(struct inode *inode, struct file *file)
+{
+    return single_open(file, overflow_show, NULL);
+}
+
+static const struct file_operations overflow_fops = {
+    .owner = THIS_MODULE,
+    .open = overflow_open,
+    .read = seq_read,
+    .llseek = seq_lseek,
+    .release = single_release,
+};
+
 static void cleanup_all(void)
 {
     int i;
@@ -165,6 +247,7 @@ static void cleanup_all(void)
         debugfs_remove_recursive(dbg_dir);
         dbg_dir = NULL;
         dbg_stats_file = NULL;
+        dbg_overflow_file = NULL;
     }
 
     /* stop threads that were created */
@@ -179,6 +262,11 @@ static void cleanup_all(void)
     /* give threads a moment to exit */
     msleep(50);
 
+    if (overflow_stats_fn) {
+        symbol_put(ron_overflow_stats);
+        overflow_stats_fn = NULL;
+    }
+
     kfree(shared_counters);
     shared_counters = NULL;
     kfree(wstats);
@@ -188,10 +276,11 @@ static void cleanup_all(void)
 static int __init tsp_kbench_init(void)
 {
     int i;
-    pr_info("tsp_kbench: init threads=%d iterations=%lu work_size=%d bind=%d\n",
-            threads, iterations, work_size, bind_cpus);
+    pr_info("tsp_kbench: init threads=%d iterations=%lu work_size=%d bind=%d nest_depth=%d\n",
+            threads, iterations, work_size, bind_cpus, nest_depth);
 
     if (threads <= 0) return -EINVAL;
+    if (nest_depth < 0 || nest_depth > MAX_NEST_DEPTH) return -EINVAL;
 
     wstats = kcalloc(threads, sizeof(struct worker_stats), GFP_KERNEL);
     if (!wstats) return -ENOMEM;
@@ -204,6 +293,13 @@ static int __init tsp_kbench_init(void)
 
     spin_lock_init(&global_lock);
 
+    /* snapshot overflow counters so debugfs reports this run only */
+    overflow_stats_fn = symbol_get(ron_overflow_stats);
+    if (overflow_stats_fn)
+        overflow_stats_fn(&overflow_queued0, &overflow_spin0, &ron_max_nodes, &ron_nr_nodes);
+    else
+        pr_info("tsp_kbench: ron_overflow_stats not available, no overflow counts\n");
+
     /* create debugfs first so that readers can access stats even if threads are starting */
     dbg_dir = debugfs_create_dir("tsp_kbench", NULL);
     if (!dbg_dir) {
@@ -215,6 +311,8 @@ static int __init tsp_kbench_init(void)
             pr_warn("tsp_kbench: failed to create stats file\n");
             debugfs_remove_recursive(dbg_dir);
             dbg_dir = NULL;
+        } else {
+            dbg_overflow_file = debugfs_create_file("overflow", 0444, dbg_dir, NULL, &overflow_fops);
         }
     }
 
@@ -229,6 +327,10 @@ static int __init tsp_kbench_init(void)
         wstats[i].max_hold_ns = 0;
         wstats[i].last_cpu = -1;
         spin_lock_init(&wstats[i].stats_lock);
+        for (int k = 0; k < MAX_NEST_DEPTH; ++k) {
+            spin_lock_init(&wstats[i].nest_locks[k]);
+            lockdep_set_class(&wstats[i].nest_locks[k], &nest_keys[k]);
+        }
         snprintf(name, sizeof(name), "tspk/%d", i);
         wstats[i].task = kthread_run(worker_fn, &wstats[i], name);
         if (IS_ERR(wstats[i].task)) {